@@ -5,48 +5,59 @@ import matplotlib.pyplot as mpl
 import soslines as sos
 
 
+def read_bsc_columns():
+    """
+    Parse the fixed-width bright star catalog in one np.genfromtxt pass and
+    return (num, name, glon, glat, vmag) as parallel arrays, with rows
+    dropped where any of the numeric fields is blank or malformed.
+    """
+    arr = np.genfromtxt('bsc5.dat', delimiter=(4, 10, 76, 6, 6, 5),
+        usecols=(0, 1, 3, 4, 5),
+        dtype=[('num', 'f8'), ('name', 'U10'), ('glon', 'f8'),
+            ('glat', 'f8'), ('vmag', 'f8')],
+        autostrip=True, encoding='ascii', invalid_raise=False)
+    good = ~(np.isnan(arr['num']) | np.isnan(arr['glon'])
+        | np.isnan(arr['glat']) | np.isnan(arr['vmag']))
+    arr = arr[good]
+    return (arr['num'].astype(int), arr['name'], arr['glon'], arr['glat'],
+        arr['vmag'])
+
+
 def read_bsc():
-    with open('bsc5.dat') as f:
-        lines = f.readlines()
-    data = []
-    for line in lines:
-        try:
-            num = int(line[0:4])
-            name = line[4:14].strip()
-            #print(line[90:107])
-            glon = float(line[90:96])
-            glat = float(line[96:102])
-            vmag = float(line[102:107])
-            #print(num, '*', name, '*', glon, '*', glat, '*', vmag)
-            t = (num, name, glon, glat, vmag)
-            data.append(t)
-        except:
-            #print('fail')
-            #print(line)
-            pass
-    return data
+    num, name, glon, glat, vmag = read_bsc_columns()
+    return list(zip(num.tolist(), name.tolist(), glon.tolist(), glat.tolist(),
+        vmag.tolist()))
 
 
 def read_bsc2():
-    with open('bsc5.dat') as f:
-        lines = f.readlines()
-    data = {} 
-    for line in lines:
-        try:
-            num = int(line[0:4])
-            name = line[4:14].strip()
-            #print(line[90:107])
-            glon = float(line[90:96])
-            if glon > 180:
-                glon = glon - 360.0
-            glat = float(line[96:102])
-            vmag = float(line[102:107])
-            data[num] = (glon, glat, name, vmag)
-        except:
-            #print('fail')
-            #print(line)
-            pass
-    return data
+    num, name, glon, glat, vmag = read_bsc_columns()
+    glon = np.where(glon > 180, glon - 360.0, glon)
+    return {n: (lo, la, nm, vm) for n, lo, la, nm, vm
+        in zip(num.tolist(), glon.tolist(), glat.tolist(), name.tolist(),
+            vmag.tolist())}
+
+
+def load_bsc_soa():
+    """
+    Load the catalog as parallel arrays plus a star-number -> array-index
+    lookup table.  num_to_idx[n] is the index of star number n, or -1 for
+    numbers not in the catalog, so pair endpoints can be fetched with a
+    single vectorized gather instead of rebuilding a dict per constellation.
+    """
+    num, name, glon, glat, vmag = read_bsc_columns()
+    glon = np.where(glon > 180, glon - 360.0, glon)
+    num_to_idx = np.full(np.amax(num) + 1, -1, dtype='int64')
+    num_to_idx[num] = np.arange(len(num))
+    return num, name, glon, glat, vmag, num_to_idx
+
+
+def find_constellation(name_arr, tag):
+    """
+    Return the indices of stars whose name contains the literal substring
+    tag (e.g. 'Ori'), using a single np.char.find pass instead of a regex
+    per star.
+    """
+    return np.where(np.char.find(name_arr, tag) >= 0)[0]
 
 
 def foo():
@@ -70,8 +81,8 @@ def foo():
 
 def foo2():
     data = read_bsc()
-    name = [x[1] for x in data]
-    ind = np.array([i for i, x in enumerate(name) if re.search('Ori', x)])
+    name = np.array([x[1] for x in data], dtype='U10')
+    ind = find_constellation(name, 'Ori')
 
     num = [data[i][0] for i in ind]
     name = [data[i][1] for i in ind]
@@ -107,13 +118,13 @@ def foo2():
 
 def foo3():
     data = read_bsc()
-    name = [x[1] for x in data]
-    #ind = np.array([i for i, x in enumerate(name) if re.search('Ori', x)])
-    #ind = np.array([i for i, x in enumerate(name) if re.search('Gem', x)])
-    #ind = np.array([i for i, x in enumerate(name) if re.search('Cas', x)])
-    #ind = np.array([i for i, x in enumerate(name) if re.search('UMa', x)])
-    #ind = np.array([i for i, x in enumerate(name) if re.search('UMi', x)])
-    ind = np.array([i for i, x in enumerate(name) if re.search('Dra', x)])
+    name = np.array([x[1] for x in data], dtype='U10')
+    #ind = find_constellation(name, 'Ori')
+    #ind = find_constellation(name, 'Gem')
+    #ind = find_constellation(name, 'Cas')
+    #ind = find_constellation(name, 'UMa')
+    #ind = find_constellation(name, 'UMi')
+    ind = find_constellation(name, 'Dra')
 
     num = [data[i][0] for i in ind]
     name = [data[i][1] for i in ind]
@@ -149,22 +160,29 @@ def foo3():
 
 
 def foo4():
-    data = read_bsc2()
+    num, name, glon, glat, vmag, num_to_idx = load_bsc_soa()
 
-    with open('constellations.txt') as f:
-        lines = f.readlines()
-    pairs = [[int(x) for x in line.split()] for line in lines if not re.search('#', line)]
+    pairs = np.loadtxt('constellations.txt', dtype=int, comments='#')
+    pairs = pairs[np.all((pairs >= 0) & (pairs < len(num_to_idx)), axis=1)]
+    a = num_to_idx[pairs[:,0]]
+    b = num_to_idx[pairs[:,1]]
+    valid = (a >= 0) & (b >= 0)
+    a = a[valid]
+    b = b[valid]
 
     c = sos.Canvas(height=2048)
 
-    for p in pairs:
-        print(p)
-        a = data[p[0]]
-        b = data[p[1]]
-        lon = np.array((a[0], b[0]))
-        lat = np.array((a[1], b[1]))
-        mpl.plot(-lon, lat, '--k', alpha=0.5)
-        c.line(a[1], -a[0], b[1], -b[0], line_width=0.5)
+    # One NaN-separated polyline hands every edge to matplotlib in a single
+    # backend call instead of one plot() per edge.
+    neglon = np.full((len(a), 3), np.nan)
+    lat = np.full((len(a), 3), np.nan)
+    neglon[:,0] = -glon[a]
+    neglon[:,1] = -glon[b]
+    lat[:,0] = glat[a]
+    lat[:,1] = glat[b]
+    mpl.plot(neglon.ravel(), lat.ravel(), '--k', alpha=0.5)
+
+    c.draw_lines(glat[a], -glon[a], glat[b], -glon[b], line_width=0.5)
     c.imsave('constellations1.png')
     mpl.show()
     
@@ -1,7 +1,10 @@
 
+import math
+
 import numpy as np
 import matplotlib.pyplot as mpl
 import matplotlib.pyplot as mpl
+from numba import njit, prange, vectorize
 
 def row2lat(height, row):
     return 90 - 180 * (row + 0.5) / height
@@ -19,23 +22,232 @@ def lon2col(height, lon):
     return int(np.floor((lon + 180) * height / 180.0))
 
 
+_DEG2RAD = np.pi / 180
+
+
+@vectorize(['float32(float32,float32)', 'float64(float64,float64)'],
+    target='parallel')
+def _llx(lat, lon):
+    return math.cos(lat * _DEG2RAD) * math.cos(lon * _DEG2RAD)
+
+
+@vectorize(['float32(float32,float32)', 'float64(float64,float64)'],
+    target='parallel')
+def _lly(lat, lon):
+    return math.cos(lat * _DEG2RAD) * math.sin(lon * _DEG2RAD)
+
+
+@vectorize(['float32(float32,float32)', 'float64(float64,float64)'],
+    target='parallel')
+def _llz(lat, lon):
+    return math.sin(lat * _DEG2RAD)
+
+
 def latlon2vec(lat, lon):
-    cos_lon = np.cos(lon * np.pi / 180)
-    sin_lon = np.sin(lon * np.pi / 180)
-    cos_lat = np.cos(lat * np.pi / 180)
-    sin_lat = np.sin(lat * np.pi / 180)
-    vec = np.array((cos_lat * cos_lon, cos_lat * sin_lon, sin_lat))
+    """
+    lat and lon are in degrees, and may be scalars or arrays of the same
+    shape.  Returns unit vectors with the XYZ components along the last
+    axis, so scalar inputs give a shape (3,) vector and shape (N,) inputs
+    give a shape (N,3) array.  The components are computed by compiled,
+    multi-threaded ufuncs, so large arrays of positions convert in one call.
+    """
+    lat = np.asarray(lat)
+    lon = np.asarray(lon)
+    vec = np.stack((_llx(lat, lon), _lly(lat, lon), _llz(lat, lon)), axis=-1)
     return vec
 
 
+@njit(cache=True, fastmath=True, parallel=True)
+def _paint_tile(x, y, z, canvas, r0, r1, c0, c1, orth, along_a, along_b,
+        dot_limit_width, dot_limit_width2):
+    """
+    Paint one line-segment tile (rectangle plus endpoint disks) directly into
+    canvas[r0:r1,c0:c1].  The three dot products, squared distances, and
+    predicates are fused into a single pass over the tile, so each pixel is
+    read once and written at most once.
+    """
+    for r in prange(r0, r1):
+        for c in range(c0, c1):
+            vx = x[r,c]
+            vy = y[r,c]
+            vz = z[r,c]
+            dot1 = vx*orth[0] + vy*orth[1] + vz*orth[2]
+            dot2 = vx*along_a[0] + vy*along_a[1] + vz*along_a[2]
+            dot3 = vx*along_b[0] + vy*along_b[1] + vz*along_b[2]
+            rect = np.abs(dot1) < dot_limit_width and dot2 > 0 and dot3 < 0
+            disk_a = dot1*dot1 + dot2*dot2 < dot_limit_width2
+            disk_b = dot1*dot1 + dot3*dot3 < dot_limit_width2
+            if rect or disk_a or disk_b:
+                canvas[r,c] = 1.0
+
+
+@njit(cache=True, fastmath=True)
+def _paint_segment(x, y, z, canvas, lat_a, lon_a, lat_b, lon_b, line_width):
+    """
+    Paint one short, well-behaved line segment (see
+    Canvas.line_segment_internal for the caveats).  This holds the bounding
+    box computation so that whole segments can be painted from inside other
+    jitted code without going back through the interpreter.
+    """
+    height = x.shape[0]
+    width = x.shape[1]
+    # latlon2vec, inlined for nopython mode
+    cos_lat_a = np.cos(lat_a * np.pi / 180)
+    vec_a = np.array((cos_lat_a * np.cos(lon_a * np.pi / 180),
+        cos_lat_a * np.sin(lon_a * np.pi / 180),
+        np.sin(lat_a * np.pi / 180)))
+    cos_lat_b = np.cos(lat_b * np.pi / 180)
+    vec_b = np.array((cos_lat_b * np.cos(lon_b * np.pi / 180),
+        cos_lat_b * np.sin(lon_b * np.pi / 180),
+        np.sin(lat_b * np.pi / 180)))
+    orth = np.cross(vec_a, vec_b)
+    orth = orth / np.sqrt(np.sum(orth**2))
+    along_a = np.cross(orth, vec_a)
+    along_b = np.cross(orth, vec_b)
+    dot_limit_width = np.sin((0.5 * line_width) * np.pi / 180)
+    dot_limit_width2 = dot_limit_width**2
+
+    max_lat = max(np.abs(lat_a), np.abs(lat_b))
+    scale = 1 / np.cos(max_lat * np.pi / 180)
+    min_lat = min(lat_a, lat_b) - 0.5 * line_width
+    max_lat = max(lat_a, lat_b) + 0.5 * line_width
+    min_lon = min(lon_a, lon_b) - 0.5 * line_width * scale
+    max_lon = max(lon_a, lon_b) + 0.5 * line_width * scale
+
+    # Yeah, it's a hack.
+    if max_lat > 85:
+        max_lat = 90
+        min_lon = -180
+        max_lon = 180
+    if min_lat < -85:
+        min_lat = -90
+        min_lon = -180
+        max_lon = 180
+    # For wide lines that go over the lon=180 border
+    if max_lon > 180 - 0.5*line_width*scale or min_lon < -180+0.5*line_width*scale:
+        min_lon = -180
+        max_lon = 180
+
+    # lat2row and lon2col, inlined for nopython mode
+    r0 = max(int(np.floor((90 - max_lat) * height / 180.0)) - 1, 0)
+    r1 = min(int(np.floor((90 - min_lat) * height / 180.0)) + 2, height)
+    c0 = max(int(np.floor((min_lon + 180) * height / 180.0)) - 1, 0)
+    c1 = min(int(np.floor((max_lon + 180) * height / 180.0)) + 2, width)
+
+    _paint_tile(x, y, z, canvas, r0, r1, c0, c1,
+        orth, along_a, along_b, dot_limit_width, dot_limit_width2)
+
+    return r0, r1, c0, c1
+
+
+@njit(cache=True, fastmath=True)
+def _paint_subsegment(x, y, z, canvas, vec_a, along_a, step, d, line_width):
+    angle0 = d * step * np.pi / 180
+    angle1 = (d + 1) * step * np.pi / 180
+    vec0 = vec_a * np.cos(angle0) + along_a * np.sin(angle0)
+    vec1 = vec_a * np.cos(angle1) + along_a * np.sin(angle1)
+    # vec2latlon, inlined for nopython mode
+    lat_0 = np.arctan2(vec0[2], np.sqrt(vec0[0]**2 + vec0[1]**2)) * 180 / np.pi
+    lon_0 = np.arctan2(vec0[1], vec0[0]) * 180 / np.pi
+    lat_1 = np.arctan2(vec1[2], np.sqrt(vec1[0]**2 + vec1[1]**2)) * 180 / np.pi
+    lon_1 = np.arctan2(vec1[1], vec1[0]) * 180 / np.pi
+    return _paint_segment(x, y, z, canvas, lat_0, lon_0, lat_1, lon_1,
+        line_width)
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _paint_segments(x, y, z, canvas, lats, lons, line_width):
+    """
+    Paint the polyline whose vertices are given by the lats and lons arrays
+    (degrees), one segment per consecutive pair of vertices.  The segments
+    write to (mostly) disjoint tiles, so they are painted in parallel; where
+    tiles overlap, both threads write the same 1.0 value and the race is
+    benign.  Returns the union of the painted bounding boxes.
+    """
+    ur0 = x.shape[0]
+    ur1 = 0
+    uc0 = x.shape[1]
+    uc1 = 0
+    for d in prange(len(lats) - 1):
+        r0, r1, c0, c1 = _paint_segment(x, y, z, canvas, lats[d], lons[d],
+            lats[d+1], lons[d+1], line_width)
+        ur0 = min(ur0, r0)
+        ur1 = max(ur1, r1)
+        uc0 = min(uc0, c0)
+        uc1 = max(uc1, c1)
+    return ur0, ur1, uc0, uc1
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _draw_lines(x, y, z, canvas, vecs_a, vecs_b, line_width):
+    """
+    Paint many great-circle lines in one call, parallelized over the lines.
+    vecs_a and vecs_b are (N,3) arrays of endpoint unit vectors.  As in
+    _paint_segments, overlapping tiles only ever write 1.0, so races between
+    lines are benign.  Returns the union of the painted bounding boxes.
+    """
+    max_step = 5.0  # degrees
+    ur0 = x.shape[0]
+    ur1 = 0
+    uc0 = x.shape[1]
+    uc1 = 0
+    for i in prange(vecs_a.shape[0]):
+        vec_a = vecs_a[i]
+        vec_b = vecs_b[i]
+        orth = np.cross(vec_a, vec_b)
+        sin_theta = np.sqrt(np.sum(orth**2))
+        orth = orth / sin_theta
+        along_a = np.cross(orth, vec_a)
+        cos_theta = vec_a[0]*vec_b[0] + vec_a[1]*vec_b[1] + vec_a[2]*vec_b[2]
+        angle = np.arctan2(sin_theta, cos_theta) * 180 / np.pi
+        divisions = int(angle / max_step + 1)
+        step = angle / divisions
+        for d in range(divisions):
+            r0, r1, c0, c1 = _paint_subsegment(x, y, z, canvas, vec_a,
+                along_a, step, d, line_width)
+            ur0 = min(ur0, r0)
+            ur1 = max(ur1, r1)
+            uc0 = min(uc0, c0)
+            uc1 = max(uc1, c1)
+    return ur0, ur1, uc0, uc1
+
+
 def vec2latlon(vec):
-    xy_radius = np.sqrt(vec[0]**2 + vec[1]**2)
-    z = vec[2]
+    """
+    vec holds XYZ components along its last axis, so it may be a single
+    shape (3,) vector or a shape (N,3) array.  Returns (lat, lon) in
+    degrees, scalars or shape (N,) arrays to match.
+    """
+    vec = np.asarray(vec)
+    xy_radius = np.sqrt(vec[...,0]**2 + vec[...,1]**2)
+    z = vec[...,2]
     lat = np.arctan2(z, xy_radius) * 180 / np.pi
-    lon = np.arctan2(vec[1], vec[0]) * 180 / np.pi
+    lon = np.arctan2(vec[...,1], vec[...,0]) * 180 / np.pi
     return lat, lon
 
 
+def precompile():
+    """
+    Compile all of the jitted kernels for the signatures used by Canvas, so
+    that later sessions load them from the on-disk numba cache instead of
+    paying first-call compilation latency.  Run once per machine or after
+    upgrading numba, e.g. at install time with
+
+        python -c "import soslines; soslines.precompile()"
+    """
+    x = np.zeros((2, 4), dtype='float32')
+    y = np.zeros((2, 4), dtype='float32')
+    z = np.ones((2, 4), dtype='float32')
+    canvas = np.zeros((2, 4), dtype='float32')
+    vec = np.array((1.0, 0.0, 0.0))
+    _paint_tile(x, y, z, canvas, 0, 2, 0, 4, vec, vec, vec, 0.1, 0.01)
+    _paint_segment(x, y, z, canvas, 0.0, 0.0, 1.0, 1.0, 1.0)
+    _paint_segments(x, y, z, canvas, np.array((0.0, 1.0)),
+        np.array((0.0, 1.0)), 1.0)
+    _draw_lines(x, y, z, canvas, vec.reshape(1, 3),
+        np.array((0.0, 1.0, 0.0)).reshape(1, 3), 1.0)
+
+
 class Canvas:
     """
     This is a canvas used for drawing lines, for Science on a Sphere (SOS)
@@ -62,9 +274,13 @@ class Canvas:
     column of pixels in the image.  There are twice as many columns as rows, due
     to the required width:height = 2:1 aspect ratio.
 
-    self.xyz[height,width,3] is a double precision array of unit vectors
-        pointing to the center of each pixel on the sphere.  This is used to
-        speed up computations.
+    self.x[height,width], self.y[height,width], self.z[height,width] are
+        single precision arrays holding the components of unit vectors
+        pointing to the center of each pixel on the sphere.  They are stored
+        as three separate 2-D arrays (structure-of-arrays) so that the dot
+        products in the drawing routines are contiguous reads.  The
+        self.xyz[height,width,3] property restacks them on demand for
+        backward compatibility.
     self.canvas[height,width] is a floating point grayscale array that is used
         as a temporary working space for building figures (line segments, etc)
         before writing them to the rgba array.  Values of self.canvas should be
@@ -76,36 +292,88 @@ class Canvas:
 
     def __init__(self, height=1024):
         width = 2 * height
-        self.xyz = np.zeros((height, width, 3), dtype='double')
-        self.canvas = np.zeros((height, width), dtype='float')
+        self.canvas = np.zeros((height, width), dtype='float32')
         self.rgba = np.zeros((height, width, 4), dtype='uint8')
         lon = col2lon(height, np.arange(width))
         cos_lon = np.cos(lon * np.pi / 180)
         sin_lon = np.sin(lon * np.pi / 180)
-        for row in range(height):
-            lat = row2lat(height, row)
-            cos_lat = np.cos(lat * np.pi / 180)
-            self.xyz[row,:,0] = cos_lat * cos_lon
-            self.xyz[row,:,1] = cos_lat * sin_lon
-            self.xyz[row,:,2] = np.sin(lat * np.pi / 180)
+        lat = row2lat(height, np.arange(height))
+        cos_lat = np.cos(lat * np.pi / 180)[:,None]
+        sin_lat = np.sin(lat * np.pi / 180)[:,None]
+        self.x = (cos_lat * cos_lon[None,:]).astype('float32')
+        self.y = (cos_lat * sin_lon[None,:]).astype('float32')
+        self.z = np.broadcast_to(sin_lat.astype('float32'), (height, width)).copy()
+        # Coordinate tables and the affine row/col scale, cached so that
+        # later conversions are lookups or a single multiply-add instead of
+        # recomputed trig and division.
+        self.lat_of_row = lat
+        self.lon_of_col = lon
+        self.cos_lon = cos_lon
+        self.sin_lon = sin_lon
+        self._rows_per_deg = height / 180.0
+        # Bounding box (r0, r1, c0, c1) of the region of self.canvas that has
+        # been drawn on since the last transfer, or None if it is untouched.
+        self._dirty = None
+        # Restacked (height, width, 3) copy of x/y/z, built lazily by the
+        # xyz property.  The unit vectors never change after __init__, so
+        # the cache never needs invalidation.
+        self._xyz = None
+
+    @property
+    def xyz(self):
+        if self._xyz is None:
+            self._xyz = np.stack((self.x, self.y, self.z), axis=-1)
+        return self._xyz
+
+    @property
+    def xyz_flat(self):
+        """
+        The unit vectors as a contiguous (height*width, 3) view of self.xyz,
+        so a dot product against all pixels can be dispatched as one matmul
+        without any per-row slicing.
+        """
+        return self.xyz.reshape(-1, 3)
+
+    def _lat2row(self, lat):
+        return int(np.floor((90 - lat) * self._rows_per_deg))
+
+    def _lon2col(self, lon):
+        return int(np.floor((lon + 180) * self._rows_per_deg))
+
+    def _mark_dirty(self, r0, r1, c0, c1):
+        if r1 <= r0 or c1 <= c0:
+            return
+        if self._dirty is None:
+            self._dirty = (r0, r1, c0, c1)
+        else:
+            d = self._dirty
+            self._dirty = (min(d[0], r0), max(d[1], r1),
+                min(d[2], c0), max(d[3], c1))
 
     def transfer_canvas_to_rgba(self, color=(255,255,255,255)):
         # https://en.wikipedia.org/wiki/Alpha_compositing
-        height = self.xyz.shape[0]
-        width = self.xyz.shape[1]
-        alpha = color[3] / 255.0 * self.canvas
-        alpha_over = alpha + (1 - alpha) * self.rgba[:,:,3] / 255.0
-        g = np.where(alpha_over > 0)
-        alpha_top = np.zeros((height,width))
-        alpha_top[g] = alpha[g] / alpha_over[g]
-        alpha_bottom = (1 - alpha) * (self.rgba[:,:,3] / 255.0) 
-        alpha_bottom[g] = alpha_bottom[g] / alpha_over[g]
-        for i in range(3):
-            self.rgba[:,:,i] = alpha_top * color[i] + alpha_bottom * self.rgba[:,:,i] 
-        self.rgba[:,:,3] = (alpha_over * 255.0).astype('uint8')
-        #print(np.amin(self.rgba), np.amax(self.rgba))
-        #print(np.amin(self.canvas), np.amax(self.canvas))
-        self.canvas[:,:] = 0
+        # Only the dirty bounding box of self.canvas is composited; for
+        # sparse figures on a large canvas this touches a small fraction of
+        # the rgba buffer.
+        if self._dirty is None:
+            return
+        r0, r1, c0, c1 = self._dirty
+        canvas = self.canvas[r0:r1,c0:c1]
+        rgba = self.rgba[r0:r1,c0:c1,:]
+        alpha = color[3] / 255.0 * canvas
+        alpha_under = rgba[:,:,3] * (1.0 / 255.0)
+        alpha_over = alpha + (1 - alpha) * alpha_under
+        # Where alpha_over is zero, both numerators below are also zero, so
+        # dividing by 1.0 instead gives the correct 0/0 -> 0 result without
+        # materializing a mask.
+        safe_over = np.where(alpha_over > 0, alpha_over, 1.0)
+        alpha_top = alpha / safe_over
+        alpha_bottom = (1 - alpha) * alpha_under / safe_over
+        rgba[:,:,0:3] = (alpha_top[:,:,None] * np.array(color[0:3])
+            + alpha_bottom[:,:,None] * rgba[:,:,0:3])
+        rgba[:,:,3] = (alpha_over * 255.0).astype('uint8')
+        canvas[:,:] = 0
+        self._dirty = None
 
     def imsave(self, filename='test.png', canvas_filename=None):
         mpl.imsave(filename, self.rgba)
@@ -121,16 +389,13 @@ class Canvas:
         color = (R,G,B,A), in values from 0 to 255 inclusive.
         A = alpha.  alpha = 255 is fully opaque; alpha = 0 is fully transparent.
         """
-        height = self.xyz.shape[0]
-        width = self.xyz.shape[1]
-        center = latlon2vec(lat, lon)
+        center = latlon2vec(lat, lon).astype('float32')
         radius = 0.5 * diameter 
-        dot_limit = np.cos(radius * np.pi / 180)
-        for row in range(height):
-            dots = np.dot(self.xyz[row,:,:], center)
-            g = np.where(dots > dot_limit)[0]
-            if len(g) > 0:
-                self.canvas[row,g] = 1.0
+        dot_limit = np.float32(np.cos(radius * np.pi / 180))
+        dots = self.x*center[0] + self.y*center[1] + self.z*center[2]
+        mask = dots > dot_limit
+        np.maximum(self.canvas, mask, out=self.canvas)
+        self._mark_dirty(0, self.x.shape[0], 0, self.x.shape[1])
         if transfer:
             self.transfer_canvas_to_rgba(color=color)
 
@@ -143,16 +408,14 @@ class Canvas:
         color = (R,G,B,A), in values from 0 to 255 inclusive.
         A = alpha.  alpha = 255 is fully opaque; alpha = 0 is fully transparent.
         """
-        height = self.xyz.shape[0]
-        center = latlon2vec(lat, lon)
+        center = latlon2vec(lat, lon).astype('float32')
         radius = 0.5 * diameter 
-        dot_limit0 = np.cos((radius - 0.5 * line_width) * np.pi / 180)
-        dot_limit1 = np.cos((radius + 0.5 * line_width) * np.pi / 180)
-        for row in range(height):
-            dots = np.dot(self.xyz[row,:,:], center)
-            g = np.where(np.logical_and(dots < dot_limit0, dots > dot_limit1))[0]
-            if len(g) > 0:
-                self.canvas[row,g] = 1.0
+        dot_limit0 = np.float32(np.cos((radius - 0.5 * line_width) * np.pi / 180))
+        dot_limit1 = np.float32(np.cos((radius + 0.5 * line_width) * np.pi / 180))
+        dots = self.x*center[0] + self.y*center[1] + self.z*center[2]
+        mask = np.logical_and(dots < dot_limit0, dots > dot_limit1)
+        np.maximum(self.canvas, mask, out=self.canvas)
+        self._mark_dirty(0, self.x.shape[0], 0, self.x.shape[1])
         if transfer:
             self.transfer_canvas_to_rgba(color=color)
 
@@ -165,22 +428,23 @@ class Canvas:
         color = (R,G,B,A), in values from 0 to 255 inclusive.
         A = alpha.  alpha = 255 is fully opaque; alpha = 0 is fully transparent.
         """
-        height = self.xyz.shape[0]
+        height = self.x.shape[0]
         vec_a = latlon2vec(lat_a, lon_a)
         vec_b = latlon2vec(lat_b, lon_b)
         orth = np.cross(vec_a, vec_b)
         orth = orth / np.sqrt(np.sum(orth**2))
-        along_a = np.cross(orth, vec_a)
-        along_b = np.cross(orth, vec_b)
-        dot_limit_width = np.sin((0.5 * line_width) * np.pi / 180)
+        along_a = np.cross(orth, vec_a).astype('float32')
+        along_b = np.cross(orth, vec_b).astype('float32')
+        orth = orth.astype('float32')
+        dot_limit_width = np.float32(np.sin((0.5 * line_width) * np.pi / 180))
 
         for row in range(height):
-            dots1 = np.dot(self.xyz[row,:,:], orth)
-            dots2 = np.dot(self.xyz[row,:,:], along_a)
-            dots3 = np.dot(self.xyz[row,:,:], along_b)
-            g = np.where((np.abs(dots1) < dot_limit_width) * (dots2 > 0) * (dots3 < 0))[0]
-            if len(g) > 0:
-                self.canvas[row,g] = 1.0
+            dots1 = self.x[row,:]*orth[0] + self.y[row,:]*orth[1] + self.z[row,:]*orth[2]
+            dots2 = self.x[row,:]*along_a[0] + self.y[row,:]*along_a[1] + self.z[row,:]*along_a[2]
+            dots3 = self.x[row,:]*along_b[0] + self.y[row,:]*along_b[1] + self.z[row,:]*along_b[2]
+            mask = (np.abs(dots1) < dot_limit_width) & (dots2 > 0) & (dots3 < 0)
+            self.canvas[row, mask] = 1.0
+        self._mark_dirty(0, height, 0, self.x.shape[1])
         if transfer:
             self.transfer_canvas_to_rgba(color=color)
 
@@ -202,62 +466,9 @@ class Canvas:
         will fill out the circle.  However, we will have to separately ensure
         that the endpoints of each line are fully drawn.
         """
-        height = self.xyz.shape[0]
-        width = self.xyz.shape[1]
-        vec_a = latlon2vec(lat_a, lon_a)
-        vec_b = latlon2vec(lat_b, lon_b)
-        orth = np.cross(vec_a, vec_b)
-        orth = orth / np.sqrt(np.sum(orth**2))
-        along_a = np.cross(orth, vec_a)
-        along_b = np.cross(orth, vec_b)
-        dot_limit_width = np.sin((0.5 * line_width) * np.pi / 180)
-        dot_limit_width2 = dot_limit_width**2
-
-        max_lat = max(np.abs(lat_a), np.abs(lat_b))
-        scale = 1 / np.cos(max_lat * np.pi / 180)
-        min_lat = min(lat_a, lat_b) - 0.5 * line_width
-        max_lat = max(lat_a, lat_b) + 0.5 * line_width
-        min_lon = min(lon_a, lon_b) - 0.5 * line_width * scale
-        max_lon = max(lon_a, lon_b) + 0.5 * line_width * scale
-
-        # Yeah, it's a hack.
-        if max_lat > 85:
-            max_lat = 90
-            min_lon = -180
-            max_lon = 180
-        if min_lat < -85:
-            min_lat = -90
-            min_lon = -180
-            max_lon = 180
-        # For wide lines that go over the lon=180 border
-        if max_lon > 180 - 0.5*line_width*scale or min_lon < -180+0.5*line_width*scale:
-            min_lon = -180
-            max_lon = 180
-
-        r0 = max(lat2row(height, max_lat) - 1, 0)
-        r1 = min(lat2row(height, min_lat) + 2, height)
-        c0 = max(lon2col(height, min_lon) - 1, 0)
-        c1 = min(lon2col(height, max_lon) + 2, width)
-
-        canvas = np.zeros((r1-r0, c1-c0), dtype='float')
-
-        for r, row in enumerate(range(r0,r1)):
-            dots1 = np.dot(self.xyz[row,c0:c1,:], orth)
-            dots2 = np.dot(self.xyz[row,c0:c1,:], along_a)
-            dots3 = np.dot(self.xyz[row,c0:c1,:], along_b)
-            dist_a2 = dots1**2 + dots2**2  
-            dist_b2 = dots1**2 + dots3**2  
-            # Fill in the rectangular line segment
-            g = np.where((np.abs(dots1) < dot_limit_width) * (dots2 > 0) * (dots3 < 0))[0]
-            if len(g) > 0: canvas[r,g] = 1.0
-            # Fill in the disk around point A
-            g = np.where(dist_a2 < dot_limit_width2)[0]
-            if len(g) > 0: canvas[r,g] = 1.0
-            # Fill in the disk around point B
-            g = np.where(dist_b2 < dot_limit_width2)[0]
-            if len(g) > 0: canvas[r,g] = 1.0
-
-        self.canvas[r0:r1,c0:c1] = np.maximum(self.canvas[r0:r1,c0:c1], canvas)
+        r0, r1, c0, c1 = _paint_segment(self.x, self.y, self.z, self.canvas,
+            lat_a, lon_a, lat_b, lon_b, float(line_width))
+        self._mark_dirty(r0, r1, c0, c1)
 
         #self.rgba[r0:r1,c0:c1,1] = 0.5 * self.rgba[r0:r1,c0:c1,1] + 0.5 * 255
         #self.rgba[r0:r1,c0:c1,3] = 0.5 * self.rgba[r0:r1,c0:c1,3] + 0.5 * 255
@@ -284,27 +495,48 @@ class Canvas:
         max_step = 5  # degrees
         divisions = int(angle / max_step + 1)
         step = angle / divisions
-        for d in range(divisions):
-            vec0 = vec_a * np.cos(d * step * np.pi/180) + along_a * np.sin(d * step * np.pi/180)
-            vec1 = vec_a * np.cos((d+1) * step * np.pi/180) + along_a * np.sin((d+1) * step * np.pi/180)
-            lat_0, lon_0 = vec2latlon(vec0)
-            lat_1, lon_1 = vec2latlon(vec1)
-            self.line_segment_internal(lat_0, lon_0, lat_1, lon_1,
-                line_width=line_width, color=color, transfer=False)
-            #self.disk(lat_0, lon_0, line_width, color=color, transfer=False)
+        angles = np.arange(divisions + 1) * step * np.pi / 180
+        vecs = vec_a[None,:] * np.cos(angles)[:,None] \
+            + along_a[None,:] * np.sin(angles)[:,None]
+        lats, lons = vec2latlon(vecs)
+        r0, r1, c0, c1 = _paint_segments(self.x, self.y, self.z, self.canvas,
+            lats, lons, float(line_width))
+        self._mark_dirty(r0, r1, c0, c1)
         #self.disk(lat_b, lon_b, line_width, color=color, transfer=False)
 
         if transfer:
             self.transfer_canvas_to_rgba(color=color)
 
+    def draw_lines(self, lats_a, lons_a, lats_b, lons_b, line_width=1,
+            color=(255,255,255,255), transfer=True):
+        """
+        Draw many great-circle lines in a single call.  The endpoint
+        latitudes and longitudes are arrays (degrees); line i runs from
+        (lats_a[i], lons_a[i]) to (lats_b[i], lons_b[i]).  All lines are
+        painted by one jitted kernel, so the per-call Python overhead of
+        Canvas.line is paid once instead of once per line.
+
+        color = (R,G,B,A), in values from 0 to 255 inclusive.
+        A = alpha.  alpha = 255 is fully opaque; alpha = 0 is fully transparent.
+        """
+        vecs_a = latlon2vec(np.asarray(lats_a, dtype='double'),
+            np.asarray(lons_a, dtype='double'))
+        vecs_b = latlon2vec(np.asarray(lats_b, dtype='double'),
+            np.asarray(lons_b, dtype='double'))
+        r0, r1, c0, c1 = _draw_lines(self.x, self.y, self.z, self.canvas,
+            vecs_a, vecs_b, float(line_width))
+        self._mark_dirty(r0, r1, c0, c1)
+        if transfer:
+            self.transfer_canvas_to_rgba(color=color)
+
 
     def disk(self, lat, lon, diameter, color=(255,255,255,255), transfer=True):
-        height = self.xyz.shape[0]
-        width = self.xyz.shape[1]
+        height = self.x.shape[0]
+        width = self.x.shape[1]
 
-        center = latlon2vec(lat, lon)
+        center = latlon2vec(lat, lon).astype('float32')
         radius = 0.5 * diameter 
-        dot_limit = np.cos(radius * np.pi / 180)
+        dot_limit = np.float32(np.cos(radius * np.pi / 180))
 
         min_lat = lat - 0.5 * diameter 
         max_lat = lat + 0.5 * diameter 
@@ -313,22 +545,17 @@ class Canvas:
         min_lon = lon - 0.5 * diameter * scale
         max_lon = lon + 0.5 * diameter * scale
 
-        r0 = max(lat2row(height, max_lat) - 1, 0)
-        r1 = min(lat2row(height, min_lat) + 2, height)
-        c0 = max(lon2col(height, min_lon) - 1, 0)
-        c1 = min(lon2col(height, max_lon) + 2, width)
-
-        canvas = np.zeros((r1-r0, c1-c0), dtype='float')
-        for r, row in enumerate(range(r0,r1)):
-            dots = np.dot(self.xyz[row,c0:c1,:], center)
-            g = np.where(dots > dot_limit)[0]
-            if len(g) > 0:
-                canvas[r,g] = 1.0
-
-        self.canvas[r0:r1,c0:c1] = np.maximum(self.canvas[r0:r1,c0:c1], canvas)
-
-        self.rgba[r0:r1,c0:c1,0] = 0.5 * self.rgba[r0:r1,c0:c1,0] + 0.5 * 255
-        self.rgba[r0:r1,c0:c1,3] = 0.5 * self.rgba[r0:r1,c0:c1,3] + 0.5 * 255
+        r0 = max(self._lat2row(max_lat) - 1, 0)
+        r1 = min(self._lat2row(min_lat) + 2, height)
+        c0 = max(self._lon2col(min_lon) - 1, 0)
+        c1 = min(self._lon2col(max_lon) + 2, width)
+
+        dots = (self.x[r0:r1,c0:c1]*center[0] + self.y[r0:r1,c0:c1]*center[1]
+            + self.z[r0:r1,c0:c1]*center[2])
+        mask = dots > dot_limit
+        np.maximum(self.canvas[r0:r1,c0:c1], mask,
+            out=self.canvas[r0:r1,c0:c1])
+        self._mark_dirty(r0, r1, c0, c1)
 
         if transfer:
             self.transfer_canvas_to_rgba(color=color)